@@ -1,29 +1,260 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import time
 import os
 import difflib
 import json
-import plotly.express as px
+import queue
+import threading
+import traceback
+import pyarrow as pa
+import pyarrow.csv as pa_csv
 from io import BytesIO
 
 # Assumed local modules - keeping these as per instruction
 from auth import authenticate_user
-from session import init_session, check_session_timeout, SESSION_TIMEOUT
-from audit import log_login
+from session import init_session, check_session_timeout, start_session_timer
+from audit import log_login, log_logout
 from rbac import filter_employee_data
 
 # ---------------- CONFIGURATION ----------------
 st.set_page_config(page_title="OrgaKnow | Retention Intelligence", layout="wide")
 
 # ---------------- GLOBAL CONSTANTS ----------------
-EMPLOYEE_FILE = "employees.csv"
+EMPLOYEE_FILE = "employees.csv"  # legacy store, read only when no parquet exists yet
+EMPLOYEE_PARQUET = "employees.parquet"
 EXIT_FILE = "exit_intelligence.csv"
 RISK_CONFIG_FILE = "risk_config.json"
 ACTIONS_FILE = "attrition_actions.csv"
 
+EMPLOYEE_COLUMNS = [
+    "EmployeeID", "Name", "Department", "Role", "Tenure",
+    "JobSatisfaction", "WorkLifeBalance", "ManagerSupport",
+    "CareerGrowth", "StressLevel", "AttritionRisk", "RiskBand"
+]
+
+# Accepted ExitDate formats for bulk exit uploads, most common first; ambiguous
+# slash dates read month-first, anything left over goes through per-value inference
+EXIT_DATE_FORMATS = (
+    "%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%d-%m-%Y",
+    "%Y/%m/%d", "%m/%d/%Y", "%d/%m/%Y"
+)
+
+AVAILABLE_ACTIONS = (
+    "Career Path Discussion", "Compensation Review", "Manager Coaching / 1:1",
+    "Internal Role Movement", "Workload Rebalancing", "Training / Upskilling",
+    "Engagement Survey Follow-up", "No Action – Monitor"
+)
+
+PRIMARY_EXIT_REASONS = (
+    "Compensation", "Career Growth", "Manager Relationship",
+    "Workload / Burnout", "Role Mismatch", "Work Culture",
+    "External Opportunity", "Personal Reasons"
+)
+SECONDARY_EXIT_REASONS = ("None",) + PRIMARY_EXIT_REASONS
+
+REQUIRED_EXIT_FIELDS = ("EmployeeID", "ExitDate", "ExitType", "PrimaryExitReason", "ActionTaken")
+
+# Low-cardinality text columns stored as pandas categoricals
+EMPLOYEE_CATEGORY_COLUMNS = ["Department", "Role", "RiskBand"]
+ACTION_CATEGORY_COLUMNS = ["Department", "RiskBand", "SelectedAction", "ActionStatus", "OutcomeStatus"]
+EXIT_CATEGORY_COLUMNS = ["PrimaryExitReason"]
+
+TABLE_PREVIEW_ROWS = 500  # rows sent to the browser before "Show all" is ticked
+PENDING_FLUSH_THRESHOLD = 20  # manual entries buffered before an automatic write
+
+RISK_BINS = [-np.inf, 40, 70, np.inf]
+RISK_LABELS = ["Low", "Medium", "High"]
+
 # ---------------- HELPER FUNCTIONS ----------------
 
+@st.cache_data(show_spinner=False)
+def _read_csv(path, mtime):
+    # mtime is only part of the cache key: rewriting the file invalidates the entry.
+    # IDs are read as text to match the Parquet master, which stores them as str
+    return pd.read_csv(path, dtype={"EmployeeID": str})
+
+@st.cache_resource
+def _csv_write_queue():
+    # One writer thread per server process so full-file rewrites stay off the button path
+    jobs = queue.Queue()
+
+    def work():
+        while True:
+            df, path, errors = jobs.get()
+            try:
+                df.to_csv(path, index=False)
+            except Exception as e:
+                traceback.print_exc()
+                errors.append(f"{path}: {e}")
+            finally:
+                jobs.task_done()
+
+    threading.Thread(target=work, name="csv-writer", daemon=True).start()
+    return jobs
+
+def save_csv_async(df, path):
+    # Failures land in this session's list and are reported by wait_for_csv_writes
+    errors = st.session_state.setdefault("csv_write_errors", [])
+    _csv_write_queue().put((df.copy(), path, errors))
+    _read_csv.clear()
+
+def wait_for_csv_writes():
+    # Called before loading so a rerun never reads a file that is still being rewritten
+    _csv_write_queue().join()
+    errors = st.session_state.get("csv_write_errors")
+    while errors:
+        st.error(f"A background save failed and was not written: {errors.pop(0)}")
+
+def append_csv(df, path):
+    # Appends rows in the file's own column order instead of rewriting the whole file
+    wait_for_csv_writes()
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        columns = pd.read_csv(path, nrows=0).columns
+        df.reindex(columns=columns).to_csv(path, mode="a", header=False, index=False)
+    else:
+        df.to_csv(path, index=False)
+    _read_csv.clear()
+
+@st.cache_data(show_spinner=False)
+def _read_parquet(path, mtime):
+    return pd.read_parquet(path, engine="pyarrow")
+
+def as_categories(df, columns):
+    return df.astype({col: "category" for col in columns if col in df.columns})
+
+def employee_data_version():
+    # (path, mtime) of the file load_employees reads: the parquet master, or the
+    # legacy CSV until the first save. Part of every cache key for employee data
+    for path in (EMPLOYEE_PARQUET, EMPLOYEE_FILE):
+        if os.path.exists(path):
+            return path, os.path.getmtime(path)
+    return None
+
+def load_employees():
+    version = employee_data_version()
+    if version is None:
+        df = pd.DataFrame(columns=EMPLOYEE_COLUMNS)
+    elif version[0] == EMPLOYEE_PARQUET:
+        df = _read_parquet(*version)
+    else:
+        df = _read_csv(*version)
+    return as_categories(df, EMPLOYEE_CATEGORY_COLUMNS)
+
+def save_employees(df):
+    # Manual entries mix int and str in these columns, which Arrow cannot store
+    df = df.astype({"EmployeeID": str, "Tenure": str})
+    # Parquet keeps the categorical dtypes, so later loads skip the conversion
+    df = as_categories(df, EMPLOYEE_CATEGORY_COLUMNS)
+    df.to_parquet(EMPLOYEE_PARQUET, engine="pyarrow", compression="zstd", index=False)
+    _read_parquet.clear()
+    # df already contains any buffered manual entries, so the buffer is emptied
+    st.session_state.pending_rows = []
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def csv_bytes(fingerprint, _df):
+    # _df is not hashed; the caller's fingerprint must change whenever the data does.
+    # Arrow's multi-threaded CSV writer; pandas is the fallback for mixed-type columns
+    buf = BytesIO()
+    try:
+        pa_csv.write_csv(pa.Table.from_pandas(_df, preserve_index=False), buf)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        return _df.to_csv(index=False).encode()
+    return buf.getvalue()
+
+@st.cache_data(show_spinner=False)
+def _read_json(path, mtime):
+    with open(path, "r") as f:
+        return json.load(f)
+
+def file_mtime(path):
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+@st.cache_data(show_spinner=False)
+def build_exit_learning(_exit_df, _actions_df, _employee_df, exit_mtime, actions_mtime, emp_version):
+    # DataFrames are excluded from hashing; the file mtimes identify the data version
+    if _exit_df.empty:
+        return {}, {}
+
+    # Most common exit reason per (role, department), used by Tab 3's action nudge
+    exit_profile = _exit_df[["EmployeeID", "PrimaryExitReason"]].merge(
+        _employee_df[["EmployeeID", "Role", "Department"]],
+        on="EmployeeID",
+        how="left"
+    )
+    top_exit_reason = (
+        exit_profile
+        .groupby(["Role", "Department"], observed=True)["PrimaryExitReason"]
+        .agg(lambda s: s.value_counts().idxmax() if s.notna().any() else None)
+        .to_dict()
+    )
+
+    # Learn historically failed actions (only the action taken is needed from actions_df)
+    action_learning = _exit_df.merge(
+        _actions_df[["EmployeeID", "SelectedAction"]],
+        on="EmployeeID",
+        how="left"
+    )
+    action_learning = action_learning[action_learning["ActionTaken"] == "Yes"]
+    action_learning_summary = action_learning.groupby(
+        ["PrimaryExitReason", "SelectedAction"], observed=True
+    ).size().reset_index(name="FailureCount")
+
+    failed_action_map = (
+        action_learning_summary
+        .sort_values("FailureCount", ascending=False)
+        .groupby("PrimaryExitReason", observed=True)
+        .head(2)
+        .groupby("PrimaryExitReason", observed=True)["SelectedAction"]
+        .apply(frozenset)
+        .to_dict()
+    )
+    return top_exit_reason, failed_action_map
+
+@st.cache_data(show_spinner=False)
+def valid_employee_ids(_employee_df, emp_version, pending_ids):
+    # Shared across reruns and sessions; keyed on the stored data version plus this session's buffered IDs
+    return frozenset(_employee_df["EmployeeID"].astype(str))
+
+@st.cache_data(show_spinner=False)
+def employee_risk_by_id(_employee_df, emp_version, pending_ids):
+    # Current AttritionRisk keyed by the (string) EmployeeID index; first record wins for repeated IDs
+    risk = _employee_df["AttritionRisk"]
+    return risk[~risk.index.duplicated(keep="first")]
+
+def index_by_employee_id(df):
+    # Hashed lookups by ID; the index is unnamed so merges on the EmployeeID column stay unambiguous
+    return df.set_index(df["EmployeeID"].astype(str).rename(None))
+
+def flush_pending_rows():
+    # Writes this session's buffered manual entries on top of the stored master
+    pending_rows = st.session_state.get("pending_rows")
+    if pending_rows:
+        save_employees(pd.concat([load_employees(), pd.DataFrame(pending_rows)], ignore_index=True))
+
+@st.cache_data(show_spinner=False)
+def default_col_mapping(columns, required_fields):
+    """
+    Default selectbox index for each required field, computed once per uploaded header.
+    A name that matches once case and punctuation are ignored ("Employee ID" for
+    EmployeeID) is taken directly; anything else falls back to difflib as before.
+    """
+    def normalize(name):
+        return "".join(ch for ch in name.lower() if ch.isalnum())
+
+    columns = [str(c) for c in columns]
+    normalized = [normalize(c) for c in columns]
+    mapping = {}
+    for field in required_fields:
+        key = normalize(field)
+        idx = next((i for i, c in enumerate(normalized) if c == key), None)
+        if idx is None:
+            matches = difflib.get_close_matches(field, columns, n=1, cutoff=0.4)
+            idx = columns.index(matches[0]) if matches else 0
+        mapping[field] = idx
+    return mapping
+
 def load_risk_weights():
     defaults = {
         "js": 0.25,      # Job Satisfaction
@@ -33,8 +264,7 @@ def load_risk_weights():
         "stress": 0.30   # Stress
     }
     if os.path.exists(RISK_CONFIG_FILE):
-        with open(RISK_CONFIG_FILE, "r") as f:
-            return json.load(f)
+        return _read_json(RISK_CONFIG_FILE, os.path.getmtime(RISK_CONFIG_FILE))
     return defaults
 
 def calculate_attrition_risk(js, wl, ms, cg, stress, weights=None):
@@ -61,6 +291,54 @@ def calculate_attrition_risk(js, wl, ms, cg, stress, weights=None):
     attrition_risk_pct = (raw_score / 6) * 100
     return round(min(attrition_risk_pct, 100), 2)
 
+def normalized_weights(weights):
+    w = np.array([weights[k] for k in ("js", "wl", "ms", "cg", "stress")], dtype=float)
+    total_weight = w.sum()
+    if total_weight == 0: total_weight = 1
+    return w / total_weight
+
+def calculate_attrition_risk_vec(df, weights):
+    # Column-wise version of calculate_attrition_risk for whole DataFrames
+    if df.empty:
+        return np.empty(0, dtype=np.float64)
+    w = normalized_weights(weights)
+
+    js = df["JobSatisfaction"].to_numpy(dtype=np.float64)
+    wl = df["WorkLifeBalance"].to_numpy(dtype=np.float64)
+    ms = df["ManagerSupport"].to_numpy(dtype=np.float64)
+    cg = df["CareerGrowth"].to_numpy(dtype=np.float64)
+    stress = df["StressLevel"].to_numpy(dtype=np.float64)
+
+    # The kernel lives outside this script so it compiles once per process, not per rerun;
+    # imported here so numba never loads on the login screen
+    from scoring import risk_scores
+    out = risk_scores(js, wl, ms, cg, stress, w)
+    if out is not None:
+        return out.round(2)
+
+    raw_score = (
+        (6 - js) * w[0] +
+        (6 - wl) * w[1] +
+        (6 - ms) * w[2] +
+        (6 - cg) * w[3] +
+        stress * w[4]
+    )
+
+    return np.minimum(raw_score / 6 * 100, 100).round(2)
+
+def risk_contributions(df):
+    # Per-employee factor matrix (N, 5); the risk score is linear in the weights
+    return np.column_stack([
+        6 - df["JobSatisfaction"].to_numpy(dtype=np.float64),
+        6 - df["WorkLifeBalance"].to_numpy(dtype=np.float64),
+        6 - df["ManagerSupport"].to_numpy(dtype=np.float64),
+        6 - df["CareerGrowth"].to_numpy(dtype=np.float64),
+        df["StressLevel"].to_numpy(dtype=np.float64)
+    ])
+
+def score_contributions(contrib, weights):
+    return np.clip(contrib @ normalized_weights(weights) / 6 * 100, 0, 100).round(2)
+
 def risk_band(score):
     if score >= 70:
         return "High"
@@ -69,6 +347,11 @@ def risk_band(score):
     else:
         return "Low"
 
+def risk_band_vec(scores):
+    # Same thresholds as risk_band, applied to a whole Series at once;
+    # a NaN score falls through to "Low" there, so it does here too
+    return pd.cut(scores, RISK_BINS, labels=RISK_LABELS, right=False).fillna("Low").astype(str)
+
 def guard(allowed_roles):
     if st.session_state.user["role"] not in allowed_roles:
         st.error("Access denied")
@@ -90,30 +373,14 @@ def risk_arrow(change):
     else:
         return "→ No Change"
 
-def style_risk_rows(row):
-    if "RiskBand" not in row:
-        return [""] * len(row)
-
-    if row["RiskBand"] == "High":
-        return ["background-color: #7f1d1d; color: white"] * len(row)
-    elif row["RiskBand"] == "Medium":
-        return ["background-color: #78350f; color: white"] * len(row)
-    elif row["RiskBand"] == "Low":
-        return ["background-color: #14532d; color: white"] * len(row)
-    else:
-        return [""] * len(row)
-
-def kpi_card(title, value, tone="neutral"):
-    colors = {
-        "high": "#7f1d1d",
-        "medium": "#78350f",
-        "low": "#14532d",
-        "neutral": "#0f172a"
-    }
-    bg = colors.get(tone, "#0f172a")
+KPI_COLORS = {
+    "high": "#7f1d1d",
+    "medium": "#78350f",
+    "low": "#14532d",
+    "neutral": "#0f172a"
+}
 
-    st.markdown(
-        f"""
+KPI_TEMPLATE = """
         <div style="
             background: linear-gradient(135deg, {bg}, #020617);
             border: 1px solid #1e293b;
@@ -138,21 +405,82 @@ def kpi_card(title, value, tone="neutral"):
                 {value}
             </div>
         </div>
-        """,
+        """
+
+def show_table(df, key, style=None):
+    # Large logs ship only their latest rows per rerun unless the user asks for everything
+    if len(df) > TABLE_PREVIEW_ROWS and not st.checkbox(f"Show all {len(df)} rows", key=f"show_all_{key}"):
+        st.caption(f"Showing the latest {TABLE_PREVIEW_ROWS} of {len(df)} rows")
+        df = df.tail(TABLE_PREVIEW_ROWS)
+    st.dataframe(style(df) if style else df, use_container_width=True)
+
+def kpi_card(title, value, tone="neutral"):
+    bg = KPI_COLORS.get(tone, "#0f172a")
+    st.markdown(
+        KPI_TEMPLATE.format(bg=bg, title=title, value=value),
         unsafe_allow_html=True
     )
 
+@st.cache_data(show_spinner=False, max_entries=32)
+def cached_figure(kind, data, **kwargs):
+    # Plotly figure for small aggregated frames, reused while the data is unchanged
+    import plotly.express as px
+    return getattr(px, kind)(data, **kwargs)
+
+def append_sheet(wb, title, df):
+    # Streamed write-only sheet; NaN becomes an empty cell as with DataFrame.to_excel
+    ws = wb.create_sheet(title=title)
+    ws.append(list(df.columns))
+    cells = df.astype(object).where(df.notna(), None)
+    for row in cells.itertuples(index=False, name=None):
+        ws.append(row)
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def build_retention_report(employee_df_full, actions_df):
+    # Rebuilt only when either DataFrame's contents change
+    # EXEC SUMMARY
+    total_emp = len(employee_df_full)
+    rb = employee_df_full["RiskBand"].value_counts()
+    high, medium, low = int(rb.get("High", 0)), int(rb.get("Medium", 0)), int(rb.get("Low", 0))
+    expected_leavers = round(employee_df_full["AttritionRisk"].sum() / 100, 2)
+    est_cost = int(expected_leavers * 500000)
+
+    exec_summary = pd.DataFrame({
+        "Metric": ["Total Employees", "High Risk Employees", "Medium Risk Employees", "Low Risk Employees", "Expected Leavers", "Estimated Attrition Cost ($)"],
+        "Value": [total_emp, high, medium, low, expected_leavers, est_cost]
+    })
+
+    is_high = (employee_df_full["RiskBand"] == "High").to_numpy()
+    high_risk_emps = employee_df_full[is_high].sort_values("AttritionRisk", ascending=False)
+    action_summary = actions_df if not actions_df.empty else pd.DataFrame({"Info": ["No actions logged yet"]})
+
+    segment_stats = employee_df_full.assign(
+        _is_high=is_high
+    ).groupby("Department", sort=False, observed=True).agg(
+        Headcount=("EmployeeID", "count"),
+        Avg_Risk=("AttritionRisk", "mean"),
+        High_Risk_Count=("_is_high", "sum")
+    ).reset_index()
+
+    from openpyxl import Workbook  # deferred so the login screen skips the openpyxl import
+    wb = Workbook(write_only=True)
+    append_sheet(wb, "Executive Summary", exec_summary)
+    append_sheet(wb, "High Risk Employees", high_risk_emps)
+    append_sheet(wb, "Department Risk Stats", segment_stats)
+    append_sheet(wb, "Retention Actions Log", action_summary)
+
+    output = BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
 # ---------------- SESSION INITIALIZATION ----------------
+# Runs first so an expired session falls through to the login screen below;
+# manual entries still buffered in the session are saved before it is cleared
+check_session_timeout(on_expire=flush_pending_rows)
 init_session()
 CURRENT_WEIGHTS = load_risk_weights()
 
 # ---------------- LOGIN SCREEN ----------------
-if "logged_in" not in st.session_state:
-    st.session_state.logged_in = False
-
-
-
-    # ---------------- LOGIN STYLING ----------------
 if not st.session_state.logged_in:
 
     # ---------- LOGIN STYLING ----------
@@ -217,6 +545,9 @@ if not st.session_state.logged_in:
         </div>
         """, unsafe_allow_html=True)
 
+        if st.session_state.get("expired"):
+            st.error("Session expired. Please log in again.")
+
         username = st.text_input("Username")
         password = st.text_input("Password", type="password")
 
@@ -224,9 +555,10 @@ if not st.session_state.logged_in:
             user = authenticate_user(username, password)
             if user:
                 st.session_state.logged_in = True
-                st.session_state.login_time = time.time()
+                start_session_timer()
                 st.session_state.user = user
-                
+                st.session_state.pop("expired", None)
+
                 log_login(user["username"], user["role"])
 
                 st.success("Login successful")
@@ -243,26 +575,20 @@ if not st.session_state.logged_in:
     st.stop()
 
 # ---------------- AUTHENTICATED LOGIC STARTS HERE ----------------
-check_session_timeout()
 user = st.session_state.user
 role = user["role"]
 dept = user["department"]
 
 # ---------------- DATA LOADING ----------------
 
+wait_for_csv_writes()
+
 # 1. Load Employees
-if os.path.exists(EMPLOYEE_FILE):
-    employee_df_full = pd.read_csv(EMPLOYEE_FILE)
-else:
-    employee_df_full = pd.DataFrame(columns=[
-        "EmployeeID", "Name", "Department", "Role", "Tenure",
-        "JobSatisfaction", "WorkLifeBalance", "ManagerSupport",
-        "CareerGrowth", "StressLevel", "AttritionRisk", "RiskBand"
-    ])
+employee_df_full = load_employees()
 
 # 2. Load Actions
 if os.path.exists(ACTIONS_FILE):
-    actions_df = pd.read_csv(ACTIONS_FILE)
+    actions_df = _read_csv(ACTIONS_FILE, os.path.getmtime(ACTIONS_FILE))
 else:
     actions_df = pd.DataFrame(columns=[
         "EmployeeID", "EmployeeName", "Department", "Manager",
@@ -275,16 +601,26 @@ if "OutcomeStatus" not in actions_df.columns:
     actions_df["OutcomeStatus"] = "Pending"
 if "OutcomeDate" not in actions_df.columns:
     actions_df["OutcomeDate"] = ""
+actions_df = as_categories(actions_df, ACTION_CATEGORY_COLUMNS)
 
 # 3. Load Exits
 if os.path.exists(EXIT_FILE):
-    exit_df = pd.read_csv(EXIT_FILE)
+    exit_df = _read_csv(EXIT_FILE, os.path.getmtime(EXIT_FILE))
 else:
     exit_df = pd.DataFrame(columns=[
         "EmployeeID", "ExitDate", "ExitType",
         "PrimaryExitReason", "SecondaryExitReason",
         "ActionTaken", "ActionHelped", "HRComment"
     ])
+exit_df = as_categories(exit_df, EXIT_CATEGORY_COLUMNS)
+
+# Manual entries buffered in this session but not yet written to disk
+pending_rows = st.session_state.setdefault("pending_rows", [])
+if pending_rows:
+    employee_df_full = pd.concat([employee_df_full, pd.DataFrame(pending_rows)], ignore_index=True)
+employee_df_full = index_by_employee_id(employee_df_full)
+# Part of cache keys for data shared across sessions, alongside employee_data_version()
+pending_ids = tuple(str(r["EmployeeID"]) for r in pending_rows)
 
 # 4. RBAC Filtered View
 employee_df_view = filter_employee_data(
@@ -294,42 +630,15 @@ employee_df_view = filter_employee_data(
 )
 
 # ---------------- GLOBAL EXIT LEARNING LAYER ----------------
-# Pre-calculate for Tab 3 and Tab 7
-if not exit_df.empty:
-    exit_merged = exit_df.merge(
-        actions_df,
-        on="EmployeeID",
-        how="left"
-    ).merge(
-        employee_df_full,
-        on="EmployeeID",
-        how="left",
-        suffixes=("_Action", "_Employee")
-    )
-    
-    # Learn historically failed actions
-    action_learning = exit_merged[exit_merged["ActionTaken"] == "Yes"]
-    action_learning_summary = action_learning.groupby(
-        ["PrimaryExitReason", "SelectedAction"]
-    ).size().reset_index(name="FailureCount")
-
-    failed_action_map = (
-        action_learning_summary
-        .sort_values("FailureCount", ascending=False)
-        .groupby("PrimaryExitReason")
-        .head(2)
-        .groupby("PrimaryExitReason")["SelectedAction"]
-        .apply(list)
-        .to_dict()
-    )
-else:
-    exit_merged = pd.DataFrame()
-    failed_action_map = {}
+# Pre-calculate for Tab 3; Tab 7 builds its own full merge
+top_exit_reason, failed_action_map = build_exit_learning(
+    exit_df, actions_df, employee_df_full,
+    file_mtime(EXIT_FILE), file_mtime(ACTIONS_FILE), employee_data_version()
+)
 
 # ---------------- SIDEBAR NAVIGATION ----------------
 # Session Time
-elapsed_time = time.time() - st.session_state.login_time
-remaining_time = max(0, SESSION_TIMEOUT - elapsed_time)
+remaining_time = max(0, st.session_state.session_deadline - time.monotonic())
 remaining_minutes = int(remaining_time // 60)
 
 st.sidebar.success(f"Logged in as {user['username']} ({user['role']})")
@@ -339,8 +648,11 @@ st.sidebar.caption(f"⏳ Session expires in: {remaining_minutes} minutes")
 
 
 if st.sidebar.button("🚪 Logout"):
+    if st.session_state.pending_rows:
+        save_employees(employee_df_full)
     log_logout(st.session_state.user["username"])
-    for key in list(st.session_state.keys()):
+    # Streamlit's own _stcore_ keys are left in place
+    for key in tuple(k for k in st.session_state if not k.startswith("_stcore_")):
         del st.session_state[key]
     st.rerun()
 
@@ -362,45 +674,58 @@ if role == "CHRO":
         if not 0.95 <= total <= 1.05:
             st.warning(f"Total weight = {round(total,2)} (ideal = 1.0)")
 
+    # Identifies the employee data a preview was scored on: stored version plus buffered entries
+    preview_data_key = (employee_data_version(), pending_ids)
+
     if st.sidebar.button("🔎 Preview Impact", key="chro_preview_model"):
         sim_df = employee_df_full.copy()
         # Preview columns (NON-DESTRUCTIVE)
-        sim_df["PreviewRisk"] = sim_df.apply(
-            lambda r: calculate_attrition_risk(
-                r["JobSatisfaction"],
-                r["WorkLifeBalance"],
-                r["ManagerSupport"],
-                r["CareerGrowth"],
-                r["StressLevel"],
-                weights=new_weights
-            ),
-            axis=1
-        )
-        sim_df["PreviewBand"] = sim_df["PreviewRisk"].apply(risk_band)
+        if all(abs(new_weights[k] - CURRENT_WEIGHTS[k]) < 1e-9 for k in new_weights):
+            # Sliders at the persisted weights: the preview is the production scoring
+            sim_df["PreviewRisk"] = sim_df["AttritionRisk"]
+            sim_df["PreviewBand"] = sim_df["RiskBand"]
+        else:
+            # Factor matrix is reused across previews until the employee data changes
+            if st.session_state.get("risk_contrib_key") != preview_data_key:
+                st.session_state.risk_contrib = risk_contributions(employee_df_full)
+                st.session_state.risk_contrib_key = preview_data_key
+            sim_df["PreviewRisk"] = score_contributions(st.session_state.risk_contrib, new_weights)
+            sim_df["PreviewBand"] = risk_band_vec(sim_df["PreviewRisk"])
         sim_df["RiskDelta"] = sim_df["PreviewRisk"] - sim_df["AttritionRisk"]
         sim_df["BandChanged"] = sim_df["RiskBand"] != sim_df["PreviewBand"]
         st.session_state.preview_df = sim_df
+        st.session_state.preview_data_key = preview_data_key
+        st.session_state.preview_weights = new_weights
 
     if st.sidebar.button("💾 Save & Apply Model", key="chro_save_model"):
         if "preview_df" not in st.session_state:
             st.error("Please preview the model before applying.")
             st.stop()
 
+        # Checked before the config is written so weights and stored scores never diverge
+        if st.session_state.get("preview_data_key") != preview_data_key:
+            st.error("Employee data changed since the preview. Please preview again.")
+            st.stop()
+
+        # The stored scores come from the preview, so persist the weights it was run with
+        new_weights = st.session_state.preview_weights
         with open(RISK_CONFIG_FILE, "w") as f:
             json.dump(new_weights, f)
+        _read_json.clear()
 
         CURRENT_WEIGHTS = new_weights
 
         # Apply preview as production
-        employee_df_full["AttritionRisk"] = st.session_state.preview_df["PreviewRisk"]
-        employee_df_full["RiskBand"] = st.session_state.preview_df["PreviewBand"]
+        employee_df_full["AttritionRisk"] = st.session_state.preview_df["PreviewRisk"].to_numpy()
+        employee_df_full["RiskBand"] = st.session_state.preview_df["PreviewBand"].to_numpy()
 
-        employee_df_full.to_csv(EMPLOYEE_FILE, index=False)
+        save_employees(employee_df_full)
         st.success("New risk algorithm applied organization-wide")
         st.rerun()
 if role == "CHRO" and "preview_df" in st.session_state:
     if st.sidebar.button("🧹 Clear Preview", key="clear_preview"):
-        del st.session_state["preview_df"]
+        for key in ("preview_df", "preview_data_key", "preview_weights"):
+            st.session_state.pop(key, None)
         st.rerun()
 
 # ---------------- CSS STYLING ----------------
@@ -471,16 +796,20 @@ st.markdown("</div>", unsafe_allow_html=True)
 
 # If CHRO Simulation is active, show the preview dashboard above tabs
 if role == "CHRO" and "preview_df" in st.session_state:
+    import plotly.express as px  # deferred so the login screen skips the plotly import
+
     st.markdown("## 🔍 Risk Algorithm Preview (Simulation)")
     st.caption("Comparing current production vs tuned algorithm")
 
     preview_df = st.session_state.preview_df
 
+    delta = preview_df["RiskDelta"].to_numpy(dtype=np.float64)
+
     col1, col2, col3, col4 = st.columns(4)
-    col1.metric("Employees Changed Band", preview_df["BandChanged"].sum())
-    col2.metric("Avg Risk Change (%)", round(preview_df["RiskDelta"].mean(), 2))
-    col3.metric("Risk Increased >5%", (preview_df["RiskDelta"] > 5).sum())
-    col4.metric("Risk Decreased >5%", (preview_df["RiskDelta"] < -5).sum())
+    col1.metric("Employees Changed Band", int(np.count_nonzero(preview_df["BandChanged"].to_numpy())))
+    col2.metric("Avg Risk Change (%)", round(float(np.nanmean(delta)), 2) if delta.size else 0.0)
+    col3.metric("Risk Increased >5%", int(np.count_nonzero(delta > 5)))
+    col4.metric("Risk Decreased >5%", int(np.count_nonzero(delta < -5)))
 
     st.markdown("### Employee-Level Comparison")
     st.dataframe(
@@ -490,11 +819,12 @@ if role == "CHRO" and "preview_df" in st.session_state:
             "PreviewRisk", "PreviewBand",
             "RiskDelta", "BandChanged"
         ]].sort_values("RiskDelta", ascending=False),
-        use_container_width=True
+        use_container_width=True,
+        hide_index=True
     )
     
     flow_df = preview_df.groupby(
-        ["RiskBand", "PreviewBand"]
+        ["RiskBand", "PreviewBand"], observed=True
     ).size().reset_index(name="Count")
 
     fig = px.sunburst(
@@ -530,7 +860,7 @@ with tab1:
         uploaded_file = None
 
     if uploaded_file:
-        upload_df = pd.read_csv(uploaded_file)
+        upload_df = pd.read_csv(uploaded_file, dtype={"EmployeeID": str})
         required_cols = [
             "EmployeeID", "Name", "Department", "Role", "Tenure",
             "JobSatisfaction", "WorkLifeBalance",
@@ -538,19 +868,11 @@ with tab1:
         ]
 
         if all(col in upload_df.columns for col in required_cols):
-            upload_df["AttritionRisk"] = upload_df.apply(
-                lambda r: calculate_attrition_risk(
-                    r["JobSatisfaction"],
-                    r["WorkLifeBalance"],
-                    r["ManagerSupport"],
-                    r["CareerGrowth"],
-                    r["StressLevel"]
-                ), axis=1
-            )
-            upload_df["RiskBand"] = upload_df["AttritionRisk"].apply(risk_band)
+            upload_df["AttritionRisk"] = calculate_attrition_risk_vec(upload_df, CURRENT_WEIGHTS)
+            upload_df["RiskBand"] = risk_band_vec(upload_df["AttritionRisk"])
 
-            employee_df_full = pd.concat([employee_df_full, upload_df], ignore_index=True)
-            employee_df_full.to_csv(EMPLOYEE_FILE, index=False)
+            employee_df_full = index_by_employee_id(pd.concat([employee_df_full, upload_df], ignore_index=True))
+            save_employees(employee_df_full)
 
             # Refresh view
             employee_df_view = filter_employee_data(
@@ -585,7 +907,7 @@ with tab1:
     stress = st.select_slider("Stress Level", [1,2,3,4,5])
 
     if st.button("Save & Predict Risk"):
-        risk = calculate_attrition_risk(js, wl, ms, cg, stress)
+        risk = calculate_attrition_risk(js, wl, ms, cg, stress, weights=CURRENT_WEIGHTS)
         new_row = {
             "EmployeeID": emp_id, "Name": name, "Department": department,
             "Role": emp_role, "Tenure": tenure,
@@ -595,25 +917,42 @@ with tab1:
             "RiskBand": risk_band(risk)
         }
 
-        if emp_id in employee_df_full["EmployeeID"].astype(str).values:
+        if emp_id in employee_df_full.index:
             st.error("Employee ID already exists. Duplicate entries are not allowed.")
         else:
-            employee_df_full = pd.concat(
-                [employee_df_full, pd.DataFrame([new_row])],
-                ignore_index=True
-            )
-            employee_df_full.to_csv(EMPLOYEE_FILE, index=False)
-            st.success(f"Predicted Attrition Risk: {risk}%")
+            st.session_state.pending_rows.append(new_row)
+            if len(st.session_state.pending_rows) >= PENDING_FLUSH_THRESHOLD:
+                employee_df_full = index_by_employee_id(pd.concat(
+                    [employee_df_full, pd.DataFrame([new_row])],
+                    ignore_index=True
+                ))
+                save_employees(employee_df_full)
+                st.success(f"Predicted Attrition Risk: {risk}%. Saved with the other buffered entries.")
+            else:
+                st.success(
+                    f"Predicted Attrition Risk: {risk}%. "
+                    "Entry is buffered and not yet saved; use Flush to disk or log out to save it."
+                )
+
+    if st.session_state.pending_rows:
+        st.caption(f"{len(st.session_state.pending_rows)} manual entries not yet written to disk")
+        if st.button("Flush to disk"):
+            save_employees(employee_df_full)
+            st.rerun()
 
     st.markdown("### Stored Employee Data")
-    st.dataframe(
-        employee_df_view.style.apply(style_risk_rows, axis=1),
-        use_container_width=True
+    show_table(
+        employee_df_view, "employees",
+        # Styler needs a unique index, which legacy data with repeated IDs may not have
+        style=lambda df: df.reset_index(drop=True).style.map(risk_color, subset=["RiskBand"])
     )
 
     st.download_button(
         "Download Employee Data (CSV)",
-        employee_df_view.to_csv(index=False),
+        csv_bytes(
+            (employee_data_version(), len(employee_df_view), role, dept, pending_ids),
+            employee_df_view
+        ),
         "orgaknow_employee_attrition_data.csv",
         "text/csv"
     )
@@ -632,14 +971,10 @@ with tab1:
             if not confirm_delete:
                 st.warning("Please confirm before deleting data.")
             else:
-                if os.path.exists(EMPLOYEE_FILE):
-                    os.remove(EMPLOYEE_FILE)
-                employee_df_full = pd.DataFrame(columns=[
-                    "EmployeeID", "Name", "Department", "Role", "Tenure",
-                    "JobSatisfaction", "WorkLifeBalance", "ManagerSupport",
-                    "CareerGrowth", "StressLevel", "AttritionRisk", "RiskBand"
-                ])
-                employee_df_full.to_csv(EMPLOYEE_FILE, index=False)
+                if os.path.exists(EMPLOYEE_PARQUET):
+                    os.remove(EMPLOYEE_PARQUET)
+                employee_df_full = pd.DataFrame(columns=EMPLOYEE_COLUMNS)
+                save_employees(employee_df_full)
                 st.success("All employee data erased successfully.")
                 st.rerun()
 
@@ -652,6 +987,8 @@ with tab1:
 # TAB 2 — EXECUTIVE DASHBOARD
 # =================================================
 with tab2:
+    import plotly.express as px
+
     st.markdown("## CHRO Executive Dashboard")
     st.caption("Workforce Attrition Risk · Financial Impact · Risk Drivers")
 
@@ -659,13 +996,8 @@ with tab2:
         st.warning("No employee data available.")
     else:
         total_emp = len(employee_df_full)
-        high_df = employee_df_full[employee_df_full["RiskBand"] == "High"]
-        med_df = employee_df_full[employee_df_full["RiskBand"] == "Medium"]
-        low_df = employee_df_full[employee_df_full["RiskBand"] == "Low"]
-
-        high_cnt = len(high_df)
-        med_cnt = len(med_df)
-        low_cnt = len(low_df)
+        band_counts = employee_df_full["RiskBand"].value_counts().reindex(["High", "Medium", "Low"], fill_value=0)
+        high_cnt, med_cnt, low_cnt = (int(c) for c in band_counts)
 
         high_pct = round((high_cnt / total_emp) * 100, 1)
         expected_leavers = round(employee_df_full["AttritionRisk"].sum() / 100, 2)
@@ -674,12 +1006,15 @@ with tab2:
         avg_risk = round(employee_df_full["AttritionRisk"].mean(), 2)
         risk_std = round(employee_df_full["AttritionRisk"].std(), 2)
 
-        critical_roles = employee_df_full[employee_df_full["Role"].isin(["Executive", "Manager"])]
-        critical_high = len(critical_roles[critical_roles["RiskBand"] == "High"])
+        critical_high = int((
+            employee_df_full["Role"].isin(["Executive", "Manager"]) &
+            (employee_df_full["RiskBand"] == "High")
+        ).sum())
 
-        dept_avg = employee_df_full.groupby("Department")["AttritionRisk"].mean()
-        top_risk_dept = dept_avg.idxmax()
-        low_risk_dept = dept_avg.idxmin()
+        dept_stats = employee_df_full.groupby("Department", observed=True)["AttritionRisk"].mean()
+        role_stats = employee_df_full.groupby("Role", observed=True)["AttritionRisk"].mean()
+        top_risk_dept = dept_stats.idxmax()
+        low_risk_dept = dept_stats.idxmin()
 
         col1, col2, col3, col4 = st.columns(4)
         k1, k2, k3, k4 = st.columns(4)
@@ -708,13 +1043,13 @@ with tab2:
         st.plotly_chart(fig1, use_container_width=True)
 
         # ---- Chart 2 — Department vs Avg Risk
-        dept_df = dept_avg.reset_index()
+        dept_df = dept_stats.reset_index()
         fig2 = px.bar(dept_df, x="Department", y="AttritionRisk", title="Average Attrition Risk by Department", text_auto=True)
         fig2.update_traces(textposition="outside")
         st.plotly_chart(fig2, use_container_width=True)
 
         # ---- Chart 3 — Role vs Avg Risk
-        role_df = employee_df_full.groupby("Role")["AttritionRisk"].mean().reset_index()
+        role_df = role_stats.reset_index()
         fig3 = px.bar(role_df, x="Role", y="AttritionRisk", title="Average Attrition Risk by Role Level", text_auto=True)
         fig3.update_traces(textposition="outside")
         st.plotly_chart(fig3, use_container_width=True)
@@ -738,13 +1073,13 @@ with tab2:
 
         # ---- Chart 7 — Heatmap
         heatmap_df = employee_df_full.pivot_table(
-            values="AttritionRisk", index="Department", columns="Role", aggfunc="mean"
+            values="AttritionRisk", index="Department", columns="Role", aggfunc="mean", observed=True
         )
         fig7 = px.imshow(heatmap_df, title="Attrition Risk Heatmap: Department × Role", aspect="auto")
         st.plotly_chart(fig7, use_container_width=True)
 
         # ---- Chart 8 — Treemap
-        treemap_df = employee_df_full.groupby(["Department", "RiskBand"]).size().reset_index(name="Headcount")
+        treemap_df = employee_df_full.groupby(["Department", "RiskBand"], observed=True).size().reset_index(name="Headcount")
         fig8 = px.treemap(treemap_df, path=["Department", "RiskBand"], values="Headcount", title="Workforce Risk Composition Tree Map")
         fig8.update_traces(textinfo="label+value")
         st.plotly_chart(fig8, use_container_width=True)
@@ -753,6 +1088,8 @@ with tab2:
 # TAB 3 — PRESCRIPTIVE ACTIONS
 # =================================================
 with tab3:
+    import plotly.express as px
+
     st.markdown("## Prescriptive Actions Engine")
     st.caption("From Risk Identification → Manager Action → Retention Outcome")
 
@@ -771,7 +1108,8 @@ with tab3:
     st.markdown("### At-Risk Employees Requiring Action")
     st.dataframe(
         scoped_df[["EmployeeID", "Name", "Department", "Role", "AttritionRisk", "RiskBand"]],
-        use_container_width=True
+        use_container_width=True,
+        hide_index=True
     )
 
     st.markdown("---")
@@ -788,28 +1126,11 @@ with tab3:
         st.info(f"**{emp['Name']}** | Dept: {emp['Department']} | Risk: {emp['AttritionRisk']}% ({emp['RiskBand']})")
 
         # SMART ACTION NUDGE
-        available_actions = [
-            "Career Path Discussion", "Compensation Review", "Manager Coaching / 1:1",
-            "Internal Role Movement", "Workload Rebalancing", "Training / Upskilling",
-            "Engagement Survey Follow-up", "No Action – Monitor"
-        ]
-
-        likely_exit_reason = None
-        dept_col = "Department_Employee" if "Department_Employee" in exit_merged.columns else "Department"
-        role_col = "Role_Employee" if "Role_Employee" in exit_merged.columns else "Role"
-
-        if not exit_merged.empty:
-            similar_exits = exit_merged[exit_merged[role_col] == emp["Role"]]
-            if dept_col in exit_merged.columns:
-                similar_exits = similar_exits[similar_exits[dept_col] == emp["Department"]]
-            
-            if not similar_exits.empty:
-                likely_exit_reason = similar_exits["PrimaryExitReason"].value_counts().idxmax()
+        likely_exit_reason = top_exit_reason.get((emp["Role"], emp["Department"]))
 
         # Remove historically failed actions
-        if likely_exit_reason and likely_exit_reason in failed_action_map:
-            avoid_actions = failed_action_map[likely_exit_reason]
-            available_actions = [a for a in available_actions if a not in avoid_actions]
+        avoid_actions = failed_action_map.get(likely_exit_reason, frozenset())
+        available_actions = [a for a in AVAILABLE_ACTIONS if a not in avoid_actions]
 
         recommended_action = st.selectbox("Recommended Action", available_actions)
         if likely_exit_reason:
@@ -841,8 +1162,12 @@ with tab3:
                 "OutcomeDate": ""
             }
 
-            actions_df = pd.concat([actions_df, pd.DataFrame([new_action])], ignore_index=True)
-            actions_df.to_csv(ACTIONS_FILE, index=False)
+            new_action_df = pd.DataFrame([new_action])
+            append_csv(new_action_df, ACTIONS_FILE)
+            # Keep the tabs rendered later in this run in step with the file
+            actions_df = as_categories(
+                pd.concat([actions_df, new_action_df], ignore_index=True), ACTION_CATEGORY_COLUMNS
+            )
             st.success("Action recorded successfully.")
 
     # ACTION MONITORING DASHBOARD
@@ -851,11 +1176,14 @@ with tab3:
     if actions_df.empty:
         st.warning("No actions recorded yet.")
     else:
+        status_counts = actions_df["ActionStatus"].value_counts()
+        risk_counts = actions_df["RiskBand"].value_counts()
+
         col1, col2, col3, col4 = st.columns(4)
         col1.metric("Total Actions Logged", len(actions_df))
-        col2.metric("High Risk Covered", len(actions_df[actions_df["RiskBand"] == "High"]))
-        col3.metric("Actions In Progress", len(actions_df[actions_df["ActionStatus"] == "In Progress"]))
-        col4.metric("Completed Actions", len(actions_df[actions_df["ActionStatus"] == "Completed"]))
+        col2.metric("High Risk Covered", int(risk_counts.get("High", 0)))
+        col3.metric("Actions In Progress", int(status_counts.get("In Progress", 0)))
+        col4.metric("Completed Actions", int(status_counts.get("Completed", 0)))
 
         fig1 = px.pie(actions_df, names="ActionStatus", title="Action Status Distribution")
         st.plotly_chart(fig1, use_container_width=True)
@@ -867,52 +1195,24 @@ with tab3:
         st.plotly_chart(fig3, use_container_width=True)
 
         st.markdown("### Detailed Action Log")
-        st.dataframe(actions_df, use_container_width=True)
+        show_table(actions_df, "action_log")
 
 # =================================================
 # TAB 4 — REPORTS
 # =================================================
 with tab4:
+    guard(["CHRO", "HRBP"])
     st.markdown("## Reports & Downloads")
     st.caption("Executive-ready reports generated from live retention data")
 
     if employee_df_full.empty:
         st.warning("No employee data available to generate reports.")
     else:
-        # EXEC SUMMARY
-        total_emp = len(employee_df_full)
-        high = len(employee_df_full[employee_df_full["RiskBand"] == "High"])
-        medium = len(employee_df_full[employee_df_full["RiskBand"] == "Medium"])
-        low = len(employee_df_full[employee_df_full["RiskBand"] == "Low"])
-        expected_leavers = round(employee_df_full["AttritionRisk"].sum() / 100, 2)
-        est_cost = int(expected_leavers * 500000)
-
-        exec_summary = pd.DataFrame({
-            "Metric": ["Total Employees", "High Risk Employees", "Medium Risk Employees", "Low Risk Employees", "Expected Leavers", "Estimated Attrition Cost ($)"],
-            "Value": [total_emp, high, medium, low, expected_leavers, est_cost]
-        })
-
-        high_risk_emps = employee_df_full[employee_df_full["RiskBand"] == "High"].sort_values("AttritionRisk", ascending=False)
-        action_summary = actions_df if not actions_df.empty else pd.DataFrame({"Info": ["No actions logged yet"]})
-
-        segment_stats = employee_df_full.groupby("Department").agg(
-            Headcount=("EmployeeID", "count"),
-            Avg_Risk=("AttritionRisk", "mean"),
-            High_Risk_Count=("RiskBand", lambda x: (x == "High").sum())
-        ).reset_index()
-
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine="openpyxl") as writer:
-            exec_summary.to_excel(writer, sheet_name="Executive Summary", index=False)
-            high_risk_emps.to_excel(writer, sheet_name="High Risk Employees", index=False)
-            segment_stats.to_excel(writer, sheet_name="Department Risk Stats", index=False)
-            action_summary.to_excel(writer, sheet_name="Retention Actions Log", index=False)
-        output.seek(0)
+        report_bytes = build_retention_report(employee_df_full, actions_df)
 
-        guard(["CHRO", "HRBP"])
         st.download_button(
             label="Download Executive & HRBP Report (Excel)",
-            data=output,
+            data=report_bytes,
             file_name="OrgaKnow_Retention_Intelligence_Report.xlsx",
             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
         )
@@ -931,17 +1231,17 @@ with tab4:
 # TAB 5 — ACTION EFFECTIVENESS
 # =================================================
 with tab5:
+    import plotly.express as px
+
     st.markdown("## Action Effectiveness Analytics")
     st.caption("Evaluating which retention actions reduce attrition risk")
 
     if actions_df.empty or employee_df_full.empty:
         st.warning("Insufficient data to evaluate action effectiveness.")
     else:
-        merged_df = actions_df.merge(
-            employee_df_full[["EmployeeID", "AttritionRisk"]],
-            on="EmployeeID", how="left", suffixes=("_AtAction", "_Current")
-        )
-        merged_df.rename(columns={"RiskScore": "Risk_At_Action", "AttritionRisk": "Risk_Current"}, inplace=True)
+        employee_risk = employee_risk_by_id(employee_df_full, employee_data_version(), pending_ids)
+        merged_df = actions_df.rename(columns={"RiskScore": "Risk_At_Action"})
+        merged_df["Risk_Current"] = actions_df["EmployeeID"].astype(str).map(employee_risk).to_numpy()
         merged_df["Risk_Change"] = merged_df["Risk_At_Action"] - merged_df["Risk_Current"]
         merged_df["RiskMovement"] = merged_df["Risk_Change"].apply(risk_arrow)
 
@@ -957,20 +1257,31 @@ with tab5:
         col4.metric("Avg Risk Change (%)", avg_risk_reduction)
         st.markdown("---")
 
-        action_effect = merged_df.groupby("SelectedAction")["Risk_Change"].mean().reset_index()
+        # Per-action aggregates for all and for high-risk employees in one groupby pass
+        is_high_risk = (merged_df["RiskBand"] == "High").to_numpy()
+        action_stats = merged_df.assign(
+            _high_change=merged_df["Risk_Change"].where(is_high_risk)
+        ).groupby("SelectedAction", observed=True).agg(
+            Risk_Change=("Risk_Change", "mean"),
+            High_Risk_Change=("_high_change", "mean")
+        )
+
+        action_effect = action_stats["Risk_Change"].reset_index()
         fig1 = px.bar(action_effect, x="SelectedAction", y="Risk_Change", title="Average Risk Reduction by Action Type")
         st.plotly_chart(fig1, use_container_width=True)
 
-        merged_df["ActionSuccess"] = merged_df["Risk_Change"].apply(lambda x: "Effective" if x > 0 else "Not Effective")
+        merged_df["ActionSuccess"] = np.where(merged_df["Risk_Change"] > 0, "Effective", "Not Effective")
         fig2 = px.histogram(merged_df, x="SelectedAction", color="ActionSuccess", title="Action Effectiveness Distribution")
         st.plotly_chart(fig2, use_container_width=True)
 
         fig3 = px.box(merged_df, x="SelectedAction", y="Risk_Change", title="Risk Change Distribution by Action")
         st.plotly_chart(fig3, use_container_width=True)
 
-        high_risk_actions = merged_df[merged_df["RiskBand"] == "High"]
-        if not high_risk_actions.empty:
-            fig4 = px.bar(high_risk_actions.groupby("SelectedAction")["Risk_Change"].mean().reset_index(),
+        if is_high_risk.any():
+            high_risk_effect = action_stats.loc[
+                action_stats["High_Risk_Change"].notna(), "High_Risk_Change"
+            ].rename("Risk_Change").reset_index()
+            fig4 = px.bar(high_risk_effect,
                           x="SelectedAction", y="Risk_Change", title="Action Effectiveness for High-Risk Employees")
             st.plotly_chart(fig4, use_container_width=True)
 
@@ -983,17 +1294,20 @@ with tab5:
 
         st.markdown("---")
         st.markdown("### Action Effectiveness Table")
-        st.dataframe(
+        show_table(
             merged_df[[
                 "EmployeeID", "EmployeeName", "SelectedAction",
                 "Risk_At_Action", "Risk_Current", "Risk_Change", "ActionStatus"
-            ]], use_container_width=True
+            ]], "action_effectiveness"
         )
 
 # =================================================
 # TAB 6 — OUTCOME TRACKING
 # =================================================
 with tab6:
+    guard(["CHRO", "HRBP"])
+    import plotly.express as px
+
     st.markdown("## Outcome Tracking")
     st.caption("Tracking retention outcomes to measure real business impact")
 
@@ -1008,19 +1322,20 @@ with tab6:
         outcome = st.selectbox("Outcome Status", ["Pending", "Stayed", "Left"])
         outcome_date = st.date_input("Outcome Date")
         
-        guard(["CHRO", "HRBP"])
         if st.button("Save Outcome"):
             idx = actions_df[actions_df["EmployeeID"] == emp_id].index[-1]
-            actions_df.loc[idx, "OutcomeStatus"] = outcome
-            actions_df.loc[idx, "OutcomeDate"] = str(outcome_date)
-            actions_df.to_csv(ACTIONS_FILE, index=False)
+            if outcome not in actions_df["OutcomeStatus"].cat.categories:
+                actions_df["OutcomeStatus"] = actions_df["OutcomeStatus"].cat.add_categories(outcome)
+            actions_df.loc[idx, ["OutcomeStatus", "OutcomeDate"]] = [outcome, str(outcome_date)]
+            save_csv_async(actions_df, ACTIONS_FILE)
             st.success("Outcome updated successfully.")
 
         st.markdown("---")
 
         total_tracked = len(actions_df)
-        stayed = len(actions_df[actions_df["OutcomeStatus"] == "Stayed"])
-        left = len(actions_df[actions_df["OutcomeStatus"] == "Left"])
+        outcome_counts = actions_df["OutcomeStatus"].value_counts()
+        stayed = int(outcome_counts.get("Stayed", 0))
+        left = int(outcome_counts.get("Left", 0))
         retention_rate = round((stayed / (stayed + left)) * 100, 1) if (stayed + left) > 0 else 0
 
         col1, col2, col3, col4 = st.columns(4)
@@ -1046,7 +1361,7 @@ with tab6:
 
         st.markdown("---")
         st.markdown("### Outcome Tracking Log")
-        st.dataframe(actions_df[["EmployeeID", "EmployeeName", "SelectedAction", "RiskScore", "OutcomeStatus", "OutcomeDate", "Manager"]], use_container_width=True)
+        show_table(actions_df[["EmployeeID", "EmployeeName", "SelectedAction", "RiskScore", "OutcomeStatus", "OutcomeDate", "Manager"]], "outcome_log")
 
 st.markdown("---")
 st.caption("OrgaKnow Retention Intelligence · Decision-support analytics. Predictions are probabilistic and should be combined with HR judgment.")
@@ -1055,6 +1370,8 @@ st.caption("OrgaKnow Retention Intelligence · Decision-support analytics. Predi
 # TAB 7 — EXIT INTELLIGENCE
 # =================================================
 with tab7:
+    import plotly.express as px
+
     # Debug info
     # st.write("EXIT MERGED COLUMNS:", exit_merged.columns.tolist()) 
 
@@ -1074,16 +1391,15 @@ with tab7:
         raw_df = pd.read_csv(exit_upload)
         st.write("Preview of uploaded data:", raw_df.head(3))
 
-        required_fields = ["EmployeeID", "ExitDate", "ExitType", "PrimaryExitReason", "ActionTaken"]
         column_mapping = {}
         
         st.markdown("#### Map Your Columns")
         st.caption("We tried to match your columns to ours. Please confirm.")
         
-        cols = st.columns(len(required_fields))
-        for i, field in enumerate(required_fields):
-            matches = difflib.get_close_matches(field, raw_df.columns, n=1, cutoff=0.4)
-            default_index = list(raw_df.columns).index(matches[0]) if matches else 0
+        default_mapping = default_col_mapping(tuple(raw_df.columns), REQUIRED_EXIT_FIELDS)
+        cols = st.columns(len(REQUIRED_EXIT_FIELDS))
+        for i, field in enumerate(REQUIRED_EXIT_FIELDS):
+            default_index = default_mapping[field]
             with cols[i % 3]: 
                 selected_col = st.selectbox(f"Map to '{field}'", raw_df.columns, index=default_index, key=f"map_{field}")
                 column_mapping[field] = selected_col
@@ -1099,23 +1415,34 @@ with tab7:
 
             # Data Validation
             standardized_df["EmployeeID"] = standardized_df["EmployeeID"].astype(str)
-            valid_ids = employee_df_full["EmployeeID"].astype(str).unique()
-            invalid_rows = standardized_df[~standardized_df["EmployeeID"].isin(valid_ids)]
+            valid_ids = valid_employee_ids(employee_df_full, employee_data_version(), pending_ids)
+            is_valid = standardized_df["EmployeeID"].map(valid_ids.__contains__).astype(bool)
+            invalid_count = int((~is_valid).sum())
+
+            if invalid_count:
+                st.warning(f"⚠️ {invalid_count} records have Employee IDs that don't exist in the Master Database. They were skipped.")
+                standardized_df = standardized_df[is_valid]
+
+            # Explicit formats keep pandas on its fast parser; later formats only see unparsed rows
+            raw_dates = standardized_df["ExitDate"].astype(str)
+            exit_dates = pd.to_datetime(raw_dates, format=EXIT_DATE_FORMATS[0], errors="coerce")
+            for fmt in EXIT_DATE_FORMATS[1:]:
+                unparsed = exit_dates.isna()
+                if not unparsed.any():
+                    break
+                exit_dates[unparsed] = pd.to_datetime(raw_dates[unparsed], format=fmt, errors="coerce")
+            unparsed = exit_dates.isna()
+            if unparsed.any():
+                exit_dates[unparsed] = raw_dates[unparsed].map(lambda v: pd.to_datetime(v, errors="coerce"))
+            if exit_dates.isnull().any():
+                st.error("Some dates could not be read. Please ensure Date format is consistent.")
+                st.stop()
+            standardized_df["ExitDate"] = exit_dates
 
-            if not invalid_rows.empty:
-                st.warning(f"⚠️ {len(invalid_rows)} records have Employee IDs that don't exist in the Master Database. They were skipped.")
-                standardized_df = standardized_df[standardized_df["EmployeeID"].isin(valid_ids)]
-        
-            exit_df = pd.concat([exit_df, standardized_df], ignore_index=True)
-            exit_df.to_csv(EXIT_FILE, index=False)
+            append_csv(standardized_df, EXIT_FILE)
             st.success(f"Successfully imported {len(standardized_df)} exit records!")
             st.rerun()
 
-            standardized_df["ExitDate"] = pd.to_datetime(standardized_df["ExitDate"], errors='coerce')
-            if standardized_df["ExitDate"].isnull().any():
-                st.error("Some dates could not be read. Please ensure Date format is consistent.")
-                st.stop()
-
     # Manual Exit Entry
     if len(left_employee_ids) == 0:
         st.info("No employees marked as 'Left' yet.")
@@ -1124,17 +1451,9 @@ with tab7:
         exit_date = st.date_input("Exit Date", key="manual_exit_date")
         exit_type = st.selectbox("Exit Type", ["Voluntary", "Involuntary", "Contract End"])
         
-        primary_reason = st.selectbox("Primary Exit Reason", [
-            "Compensation", "Career Growth", "Manager Relationship",
-            "Workload / Burnout", "Role Mismatch", "Work Culture",
-            "External Opportunity", "Personal Reasons"
-        ])
+        primary_reason = st.selectbox("Primary Exit Reason", PRIMARY_EXIT_REASONS)
         
-        secondary_reason = st.selectbox("Secondary Exit Reason (Optional)", ["None"] + [
-            "Compensation", "Career Growth", "Manager Relationship",
-            "Workload / Burnout", "Role Mismatch", "Work Culture",
-            "External Opportunity", "Personal Reasons"
-        ])
+        secondary_reason = st.selectbox("Secondary Exit Reason (Optional)", SECONDARY_EXIT_REASONS)
 
         action_taken = st.selectbox("Was any retention action taken?", ["Yes", "No"])
         action_helped = st.selectbox("Did the action help?", ["Yes", "Partially", "No", "Not Applicable"])
@@ -1151,8 +1470,12 @@ with tab7:
                 "ActionHelped": action_helped,
                 "HRComment": hr_comment
             }
-            exit_df = pd.concat([exit_df, pd.DataFrame([new_exit])], ignore_index=True)
-            exit_df.to_csv(EXIT_FILE, index=False)
+            new_exit_df = pd.DataFrame([new_exit])
+            append_csv(new_exit_df, EXIT_FILE)
+            # Keep the insights below in step with the file
+            exit_df = as_categories(
+                pd.concat([exit_df, new_exit_df], ignore_index=True), EXIT_CATEGORY_COLUMNS
+            )
             st.success("Exit intelligence saved successfully.")
 
     st.markdown("---")
@@ -1173,37 +1496,37 @@ with tab7:
         ROLE_COL = "Role_Employee" if "Role_Employee" in exit_merged.columns else "Role"
         DEPT_COL = "Department_Employee" if "Department_Employee" in exit_merged.columns else "Department"
 
-        reason_counts = exit_merged["PrimaryExitReason"].value_counts().reset_index()
-        reason_counts.columns = ["Exit Reason", "Count"]
+        reason_counts = exit_merged["PrimaryExitReason"].value_counts().rename_axis("Exit Reason").reset_index(name="Count")
 
-        fig1 = px.pie(reason_counts, names="Exit Reason", values="Count", title="Primary Reasons for Employee Attrition")
+        fig1 = cached_figure("pie", reason_counts, names="Exit Reason", values="Count", title="Primary Reasons for Employee Attrition")
         st.plotly_chart(fig1, use_container_width=True)
 
         st.markdown("#### 2. Exit Reasons by Department")
         if DEPT_COL in exit_merged.columns:
-            dept_reason = exit_merged.groupby([DEPT_COL, "PrimaryExitReason"]).size().reset_index(name="Count")
+            dept_reason = exit_merged.groupby([DEPT_COL, "PrimaryExitReason"], observed=True).size().reset_index(name="Count")
             fig2 = px.bar(dept_reason, x=DEPT_COL, y="Count", color="PrimaryExitReason", title="Exit Reasons by Department")
             st.plotly_chart(fig2, use_container_width=True)
 
         st.markdown("#### 3. Action Failure Analysis")
         action_failure = exit_merged[exit_merged["ActionTaken"] == "Yes"]
         if not action_failure.empty:
-            failure_summary = action_failure.groupby(["SelectedAction", "PrimaryExitReason"]).size().reset_index(name="Count")
+            failure_summary = action_failure.groupby(["SelectedAction", "PrimaryExitReason"], observed=True).size().reset_index(name="Count")
             fig3 = px.bar(failure_summary, x="SelectedAction", y="Count", color="PrimaryExitReason", title="Failed Retention Actions by Exit Reason")
             st.plotly_chart(fig3, use_container_width=True)
 
         st.markdown("#### 4. Risk Blind Spot Analysis")
         # Ensure RiskScore is available (it comes from actions_df merge)
         if "RiskScore" in exit_merged.columns:
-            exit_merged["RiskCategoryAtExit"] = exit_merged["RiskScore"].apply(
-                lambda x: "High Risk Exit" if pd.notnull(x) and x >= 70
-                else "Medium Risk Exit" if pd.notnull(x) and x >= 40
-                else "Low Risk Exit" if pd.notnull(x) else "Unknown"
+            risk_category = pd.cut(
+                exit_merged["RiskScore"], RISK_BINS,
+                labels=["Low Risk Exit", "Medium Risk Exit", "High Risk Exit"], right=False
+            )
+            exit_merged["RiskCategoryAtExit"] = (
+                risk_category.cat.add_categories("Unknown").fillna("Unknown").cat.remove_unused_categories()
             )
-            blindspot_counts = exit_merged["RiskCategoryAtExit"].value_counts().reset_index()
-            blindspot_counts.columns = ["Risk Category", "Count"]
+            blindspot_counts = exit_merged["RiskCategoryAtExit"].value_counts().rename_axis("Risk Category").reset_index(name="Count")
 
-            fig4 = px.bar(blindspot_counts, x="Risk Category", y="Count", title="Attrition by Risk Category at Exit")
+            fig4 = cached_figure("bar", blindspot_counts, x="Risk Category", y="Count", title="Attrition by Risk Category at Exit")
             st.plotly_chart(fig4, use_container_width=True)
 
         st.markdown("#### 5. Executive Learning Summary")
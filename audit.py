@@ -1,8 +1,23 @@
 import pandas as pd
+import streamlit as st
+import atexit
+import csv
 import os
+import queue
+import threading
+import traceback
 from datetime import datetime
 
 AUDIT_FILE = "login_audit.csv"
+AUDIT_COLUMNS = [
+    "username",
+    "role",
+    "login_time",
+    "logout_time",
+    "logout_reason"
+]
+AUDIT_BATCH_SIZE = 100
+EVENT_REASONS = {"expiry": "Session Expired"}
 
 
 def _ensure_audit_file():
@@ -10,19 +25,40 @@ def _ensure_audit_file():
         os.makedirs("data")
 
     if not os.path.exists(AUDIT_FILE):
-        df = pd.DataFrame(columns=[
-            "username",
-            "role",
-            "login_time",
-            "logout_time",
-            "logout_reason"
-        ])
+        df = pd.DataFrame(columns=AUDIT_COLUMNS)
         df.to_csv(AUDIT_FILE, index=False)
+        return
+
+    # Older audit files predate some columns; upgrade them once so appends line up
+    with open(AUDIT_FILE, newline="") as f:
+        header = next(csv.reader(f), [])
+    if header != AUDIT_COLUMNS:
+        df = pd.read_csv(AUDIT_FILE)
+        df.reindex(columns=AUDIT_COLUMNS).to_csv(AUDIT_FILE, index=False)
+
+
+@st.cache_resource(show_spinner=False)
+def _audit_sink():
+    """
+    Append handle opened once per server process and shared by every
+    session; writers take the lock and flush after each event or batch.
+    """
+    _ensure_audit_file()
+    return open(AUDIT_FILE, "a", newline="", buffering=65536), threading.Lock()
 
 
-def log_login(username: str, role: str):
-    _ensure_audit_file()
+def _write_rows(rows):
+    sink, lock = _audit_sink()
+    with lock:
+        csv.writer(sink).writerows(rows)
+        sink.flush()
+
+
+def _append_entry(entry: dict):
+    _write_rows([[entry[k] for k in AUDIT_COLUMNS]])
+
 
+def log_login(username: str, role: str):
     entry = {
         "username": username,
         "role": role,
@@ -31,25 +67,53 @@ def log_login(username: str, role: str):
         "logout_reason": ""
     }
 
-    df = pd.read_csv(AUDIT_FILE)
-    df = pd.concat([df, pd.DataFrame([entry])], ignore_index=True)
-    df.to_csv(AUDIT_FILE, index=False)
-
+    _append_entry(entry)
 
-def log_logout(username: str, reason: str = "Manual Logout"):
-    _ensure_audit_file()
 
-    df = pd.read_csv(AUDIT_FILE)
+def _logout_row(username: str, reason: str, when: datetime):
+    return [username, "", "", when.strftime("%Y-%m-%d %H:%M:%S"), reason]
 
-    mask = (df["username"] == username) & (df["logout_time"] == "")
-    if mask.any():
-        idx = df[mask].index[-1]
-        df.loc[idx, "logout_time"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        df.loc[idx, "logout_reason"] = reason
 
-    df.to_csv(AUDIT_FILE, index=False)
+def log_logout(username: str, reason: str = "Manual Logout"):
+    """
+    Logouts are recorded as their own event row rather than by
+    rewriting the matching login row.
+    """
+    _write_rows([_logout_row(username, reason, datetime.now())])
 
 
 def log_session_expiry(username: str):
     log_logout(username, reason="Session Expired")
 
+
+@st.cache_resource(show_spinner=False)
+def audit_queue():
+    """
+    Queue of (event, username, timestamp) tuples drained by one writer
+    thread per server process, so reruns never wait on the audit file.
+    """
+    events = queue.Queue()
+
+    def work():
+        while True:
+            batch = [events.get()]
+            while len(batch) < AUDIT_BATCH_SIZE:
+                try:
+                    batch.append(events.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                _write_rows(
+                    _logout_row(username, EVENT_REASONS[event], datetime.fromtimestamp(ts))
+                    for event, username, ts in batch
+                )
+            except Exception:
+                traceback.print_exc()
+            finally:
+                for _ in batch:
+                    events.task_done()
+
+    threading.Thread(target=work, name="audit-writer", daemon=True).start()
+    # The writer is a daemon thread; let it finish queued rows before the process exits
+    atexit.register(events.join)
+    return events
@@ -1,9 +1,23 @@
 import pandas as pd
+import streamlit as st
 import os
 
 USERS_FILE = "users.csv"
 
 
+@st.cache_resource(show_spinner=False)
+def _users_index(mtime: float):
+    """
+    username -> user record, shared read-only across sessions.
+    mtime is only part of the cache key so edits to users.csv are picked up.
+    """
+    df = pd.read_csv(USERS_FILE)
+    index = {}
+    for record in df.to_dict("records"):
+        index.setdefault(str(record["username"]), record)
+    return index
+
+
 def authenticate_user(username: str, password: str):
     """
     Authenticate user from users.csv
@@ -13,18 +27,11 @@ def authenticate_user(username: str, password: str):
     if not os.path.exists(USERS_FILE):
         return None
 
-    df = pd.read_csv(USERS_FILE)
-
-    user = df[
-        (df["username"].astype(str) == str(username)) &
-        (df["password"].astype(str) == str(password))
-    ]
+    row = _users_index(os.path.getmtime(USERS_FILE)).get(str(username))
 
-    if user.empty:
+    if row is None or str(row["password"]) != str(password):
         return None
 
-    row = user.iloc[0]
-
     return {
         "username": row["username"],
         "role": row["role"],
@@ -0,0 +1,45 @@
+import numpy as np
+from functools import lru_cache
+
+
+def _risk_kernel(js, wl, ms, cg, stress, wjs, wwl, wms, wcg, wstress, out):
+    # Single fused pass over the five input columns
+    for i in range(js.shape[0]):
+        r = (
+            (6 - js[i]) * wjs + (6 - wl[i]) * wwl + (6 - ms[i]) * wms +
+            (6 - cg[i]) * wcg + stress[i] * wstress
+        ) / 6 * 100
+        # NaN (a blank survey cell) stays NaN, as with np.minimum and min()
+        out[i] = r if not r > 100 else 100.0
+
+
+@lru_cache(maxsize=None)
+def risk_kernel():
+    """
+    Compiled bulk scoring kernel, built once per process on first use.
+    Returns None when numba is not installed.
+    """
+    try:
+        from numba import njit
+    except ImportError:
+        return None
+
+    try:
+        return njit(cache=True)(_risk_kernel)
+    except RuntimeError:
+        # No writable cache directory; compile in memory only
+        return njit(_risk_kernel)
+
+
+def risk_scores(js, wl, ms, cg, stress, w):
+    """
+    Attrition risk for whole float64 columns with normalised weights w,
+    or None when the compiled kernel is unavailable.
+    """
+    kernel = risk_kernel()
+    if kernel is None:
+        return None
+
+    out = np.empty(js.shape[0], dtype=np.float64)
+    kernel(js, wl, ms, cg, stress, w[0], w[1], w[2], w[3], w[4], out)
+    return out
@@ -1,41 +1,66 @@
 import streamlit as st
 import time
-from audit import log_session_expiry
-
-SESSION_TIMEOUT = 3600  # 1 hour
+from audit import audit_queue
 
+_SESSION_TTL = 3600  # 1 hour, only read at login
+TIMEOUT_CHECK_INTERVAL = 5  # seconds between expiry checks
 
 def init_session():
     """
-    Initialize required session keys
+    Initialize required session keys once per session; clearing the
+    state on logout or expiry removes the sentinel as well
     """
-    if "logged_in" not in st.session_state:
-        st.session_state.logged_in = False
+    ss = st.session_state
+    if ss.get("_initialized"):
+        return
 
-    if "login_time" not in st.session_state:
-        st.session_state.login_time = None
+    ss.update({
+        "logged_in": False,
+        "login_time": None,
+        "session_deadline": None,
+        "_initialized": True
+    })
 
+def start_session_timer():
+    """
+    Stamp the login time and the monotonic deadline the timeout check compares against
+    """
+    ss = st.session_state
+    ss.login_time = time.time()
+    ss.session_deadline = time.monotonic() + _SESSION_TTL
 
-def check_session_timeout():
+def check_session_timeout(on_expire=None):
     """
-    Enforce session timeout and auto logout
+    Enforce session timeout and auto logout. An expired session is cleared
+    and flagged with "expired" for the login screen to report; call this
+    before init_session so the defaults are seeded again. on_expire runs
+    before the state is cleared, so callers can save anything buffered in it.
     """
-    if not st.session_state.get("logged_in"):
+    ss = st.session_state
+    if not ss.get("logged_in"):
         return
 
-    login_time = st.session_state.get("login_time")
-    if not login_time:
+    # Widget interactions rerun the script many times a minute; skip the check
+    # when it ran only moments ago
+    now = time.monotonic()
+    if now - ss.get("_last_timeout_check", 0.0) < TIMEOUT_CHECK_INTERVAL:
         return
+    ss["_last_timeout_check"] = now
 
-    elapsed = time.time() - login_time
+    # Monotonic deadline set at login is immune to wall-clock jumps; login_time
+    # stays for display
+    deadline = ss.get("session_deadline")
+    if not deadline or now <= deadline:
+        return
 
-    if elapsed > SESSION_TIMEOUT:
-        username = st.session_state.get("user", {}).get("username")
-        if username:
-            log_session_expiry(username)
+    user = ss.get("user") or {}
+    username = user.get("username")
+    if username:
+        # Written by the audit thread so the expiry message is not held up by file I/O
+        audit_queue().put_nowait(("expiry", username, time.time()))
 
-        for key in list(st.session_state.keys()):
-            del st.session_state[key]
+    if on_expire:
+        on_expire()
 
-        st.error("Session expired. Please log in again.")
-        st.stop()
+    ss.clear()
+    ss["expired"] = True